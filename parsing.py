@@ -0,0 +1,242 @@
+import re
+import io
+import sys
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+
+from pypdf import PdfReader
+import streamlit as st
+
+try:
+    import pymupdf
+except ImportError:  # PyMuPDF é opcional: sem ele a extração cai no pypdf
+    pymupdf = None
+
+# -------------------------
+# Extração e parser da Curva ABC do Lince (sem UI)
+# -------------------------
+_NUM_STRIP = str.maketrans("", "", "0123456789.,")
+_RE_MULTISPACE = re.compile(r"\s{2,}")
+_RE_LETTER = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ]")
+
+# Cabeçalhos/rodapés do relatório do Lince que nunca são linhas de produto
+_LIXO = ("Curva ABC","Período","CST","ECF","Situação Tributária","Classif.","Codigo","CÓDIGO",
+         "Barras","Total do Departamento","Total Geral","www.grupotecnoweb.com.br")
+_RE_LIXO = re.compile("|".join(map(re.escape, _LIXO)))
+
+@lru_cache(maxsize=8192)
+def br_to_float(txt: str):
+    if txt is None:
+        return None
+    t = txt.strip()
+    if not t:
+        return None
+    if "," not in t:
+        # Caminho rápido: já é um literal float ("12", "3.5")
+        if t.count(".") <= 1:
+            try:
+                return float(t)
+            except ValueError:
+                return None
+        # Formato do Lince com pontos como milhar e decimal ("3.491.40")
+        parts = t.split(".")
+        try:
+            return float("".join(parts[:-1]) + "." + parts[-1])
+        except ValueError:
+            return None
+    try:
+        return float(t.replace(".", "").replace(",", "."))
+    except ValueError:
+        return None
+
+def is_num_token(tok: str) -> bool:
+    return bool(tok) and tok[0] in "0123456789" and tok.translate(_NUM_STRIP) == ""
+
+@lru_cache(maxsize=8192)
+def dec_places(tok: str) -> int:
+    if not tok:
+        return 0
+    i = max(tok.rfind(","), tok.rfind("."))
+    return 0 if i < 0 else len(tok) - i - 1
+
+def _page_text_pymupdf(page) -> str:
+    # Agrupa as palavras em linhas pela base (y1), com tolerância de meia altura
+    linhas = []
+    base = None
+    for x0, y0, x1, y1, w, *_ in sorted(page.get_text("words"), key=lambda t: (t[3], t[0])):
+        if base is None or y1 - base > (y1 - y0) / 2:
+            linhas.append([])
+            base = y1
+        linhas[-1].append((x0, w))
+    return "\n".join(" ".join(w for _, w in sorted(ln)) for ln in linhas)
+
+def _extract_text_pymupdf(file_bytes: bytes) -> str:
+    texts = []
+    with pymupdf.open(stream=file_bytes, filetype="pdf") as doc:
+        for page in doc:
+            try:
+                texts.append(_page_text_pymupdf(page))
+            except Exception:
+                texts.append("")
+    return "\n".join(texts)
+
+def _extract_text_pypdf(file_bytes: bytes) -> str:
+    reader = PdfReader(io.BytesIO(file_bytes))
+    texts = []
+    for page in reader.pages:
+        try:
+            # Página sem /Contents: em branco
+            texts.append((page.extract_text() or "") if page.get("/Contents") is not None else "")
+        except Exception:
+            texts.append("")
+    return "\n".join(texts)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def extract_text(file_bytes: bytes) -> str:
+    # PyMuPDF primeiro; o pypdf fica para quando ele falta ou não abre o arquivo
+    if pymupdf is not None:
+        try:
+            return _extract_text_pymupdf(file_bytes)
+        except Exception:
+            pass
+    return _extract_text_pypdf(file_bytes)
+
+SETORES_CANON = [
+    "Frios", "Padaria", "Confeitaria Fina", "Confeitaria Trad",
+    "Restaurante", "Salgados", "Lanchonete"
+]
+
+def _norm(s: str) -> str:
+    s = s or ""
+    if not s.isascii():
+        s = unicodedata.normalize("NFD", s).encode("ascii", "ignore").decode("ascii")
+    return s.upper()
+
+# Palavras-chave por setor, em ordem de prioridade ("FINA" já cobre "CONFEITARIA FINA", idem "TRAD")
+_SETOR_CHAVES = (
+    (("FRIO", "FIOS"), "Frios"),
+    (("PADARIA",), "Padaria"),
+    (("FINA",), "Confeitaria Fina"),
+    (("TRAD",), "Confeitaria Trad"),
+    (("RESTAURANTE",), "Restaurante"),
+    (("SALGADOS",), "Salgados"),
+    (("LANCHONETE",), "Lanchonete"),
+)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def guess_setor(text: str, filename: str) -> str:
+    hays = (_norm(filename), _norm(text))
+    for chaves, setor in _SETOR_CHAVES:
+        if any(k in h for h in hays for k in chaves):
+            return setor
+    return "Frios"
+
+def _strip_tail_codes(ln: str) -> str:
+    # Remove EAN (8-13 dígitos) e depois código (4-8) do fim da linha
+    for lo, hi in ((8, 13), (4, 8)):
+        i = len(ln)
+        while i and ln[i-1].isdecimal():
+            i -= 1
+        if lo <= len(ln) - i <= hi and (i == 0 or not (ln[i-1].isalnum() or ln[i-1] == "_")):
+            ln = ln[:i].rstrip()
+    return ln
+
+def glue_wrapped_lines(lines):
+    # Devolve as linhas já tokenizadas
+    tokenized = [ln.split() for ln in lines]
+    masks = [[is_num_token(t) for t in toks] for toks in tokenized]
+    glued = []
+    i = 0
+    n = len(lines)
+    while i < n:
+        cur_mask = masks[i]
+        nxt_mask = masks[i+1] if i + 1 < n else []
+
+        j = len(cur_mask)
+        while j > 0 and cur_mask[j-1]:
+            j -= 1
+        cur_tail_len = len(cur_mask) - j
+        nxt_num_ratio = (sum(nxt_mask) / len(nxt_mask)) if nxt_mask else 0.0
+
+        if cur_tail_len < 2 and nxt_num_ratio >= 0.5:
+            glued.append(tokenized[i] + tokenized[i+1])
+            i += 2
+        else:
+            glued.append(tokenized[i])
+            i += 1
+    return glued
+
+def clean_tokens(tokens):
+    # Descarta EAN (12+ dígitos) e o código (3-6) no início
+    out = []
+    for idx, t in enumerate(tokens):
+        if t.isdecimal():
+            n = len(t)
+            if n >= 12 or (idx == 0 and 3 <= n <= 6):
+                continue
+        out.append(t)
+    return out
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def parse_lince_lines_to_list(text: str):
+    cleaned = []
+    ms_sub = _RE_MULTISPACE.sub; lixo = _RE_LIXO.search
+    for ln in text.splitlines():
+        ln = ms_sub(" ", ln).strip()
+        if not ln or lixo(ln):
+            continue
+        cleaned.append(_strip_tail_codes(ln))
+    items_raw = []
+    for toks in glue_wrapped_lines(cleaned):
+        if not toks:
+            continue
+        toks = clean_tokens(toks)
+        if not toks:
+            continue
+
+        idx = len(toks)
+        while idx > 0 and is_num_token(toks[idx-1]):
+            idx -= 1
+        head = toks[:idx]
+        tail = toks[idx:]
+        if len(tail) < 2 or not head:
+            continue
+
+        dps = [dec_places(t) for t in tail]
+        nums = [br_to_float(t) for t in tail]
+
+        i_qtd = None
+        for j in range(len(tail)-1, -1, -1):
+            if dps[j] == 3 and nums[j] is not None:
+                i_qtd = j
+                break
+        i_val = None
+        if i_qtd is not None:
+            for j in range(i_qtd+1, len(tail)):
+                if dps[j] == 2 and nums[j] is not None:
+                    i_val = j
+                    break
+
+        if i_qtd is None or i_val is None:
+            qtd = nums[-2]; valor = nums[-1]
+        else:
+            qtd = nums[i_qtd]; valor = nums[i_val]
+
+        if qtd is None or valor is None or qtd < 0 or valor < 0:
+            continue
+
+        head_clean = [t for t in head if not is_num_token(t)]
+        nome = " ".join(head_clean)
+        if not _RE_LETTER.search(nome):
+            continue
+
+        items_raw.append((sys.intern(nome), qtd, valor))
+
+    agg = defaultdict(lambda: [0.0, 0.0])
+    for nome, qtd, valor in items_raw:
+        a = agg[nome]
+        a[0] += qtd
+        a[1] += valor
+
+    return [{"nome": k, "nome_up": k.upper(), "quantidade": a[0], "valor": a[1]} for k, a in agg.items()]
@@ -0,0 +1,62 @@
+"""Confere se PyMuPDF e pypdf dão os mesmos produtos num PDF sintético no layout do Lince.
+
+Cada célula é desenhada como um objeto de texto separado, como o Lince faz com as colunas.
+Uso: python scripts/check_extraction.py [saida.pdf]
+"""
+import os
+import sys
+
+import pymupdf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from parsing import _extract_text_pymupdf, _extract_text_pypdf, parse_lince_lines_to_list  # noqa: E402
+
+PRODUTOS = [
+    ("1234", "QUEIJO MUSSARELA FATIADO", "12,350", "3.491.40", "7891234567895"),
+    ("2345", "PRESUNTO COZIDO SADIA", "8,120", "612,55", "7899876543210"),
+    ("3456", "MORTADELA BOLOGNA", "1.250,000", "21.430,00", "7890000000017"),
+    ("45678", "SALAME ITALIANO KG", "0,875", "87,42", "7891111111115"),
+    ("5678", "PEITO DE PERU DEFUMADO", "3,000", "199,90", "7892222222229"),
+]
+COLUNAS = (40, 90, 330, 420, 500)  # código, nome, quantidade, valor, EAN
+
+
+def gerar_pdf(n_paginas: int = 3) -> bytes:
+    doc = pymupdf.open()
+    for p in range(n_paginas):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((40, 40), "Curva ABC de Produtos", fontsize=12)
+        page.insert_text((40, 58), f"Período: 01/08/2025 a 31/08/2025 - página {p + 1}", fontsize=8)
+        y = 90
+        for _ in range(6):
+            for linha in PRODUTOS:
+                for x, cel in zip(COLUNAS, linha):
+                    page.insert_text((x, y), cel, fontsize=8)
+                y += 14
+        page.insert_text((40, y + 10), "Total do Departamento", fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def main() -> int:
+    data = gerar_pdf()
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "wb") as f:
+            f.write(data)
+    resultados = {}
+    for nome, extract in (("pymupdf", _extract_text_pymupdf), ("pypdf", _extract_text_pypdf)):
+        rows = parse_lince_lines_to_list(extract(data))
+        resultados[nome] = sorted((r["nome"], round(r["quantidade"], 3), round(r["valor"], 2)) for r in rows)
+        print(f"{nome}: {len(rows)} produtos")
+    if not resultados["pymupdf"] or resultados["pymupdf"] != resultados["pypdf"]:
+        print("DIVERGEM")
+        for nome, rows in resultados.items():
+            print(nome, rows)
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())